@@ -72,6 +72,18 @@ from caterpillar import __version__ as version
 
 logger = logging.getLogger(__name__)
 
+_paragraph_tokenizer = ParagraphTokenizer()  # Stateless between calls, so shared by all writers
+_sentence_tokenizer = None  # Loaded on first use by _get_sentence_tokenizer()
+
+
+def _get_sentence_tokenizer():
+    """Return the NLTK punkt sentence tokenizer, loading it the first time it is needed."""
+    global _sentence_tokenizer
+    if _sentence_tokenizer is None:
+        # Loading twice in a race is harmless, so no lock.
+        _sentence_tokenizer = nltk.data.load('tokenizers/punkt/english.pickle')
+    return _sentence_tokenizer
+
 
 class CaterpillarIndexError(Exception):
     """Common base class for index errors."""
@@ -173,8 +185,8 @@ class IndexConfig(object):
             return instance
 
     def dumps(self):
-        """Dump this instance as a string for serialization."""
-        return cPickle.dumps(self)
+        """Dump this instance as a (binary) string for serialization."""
+        return cPickle.dumps(self, cPickle.HIGHEST_PROTOCOL)
 
 
 class IndexWriter(object):
@@ -248,7 +260,7 @@ class IndexWriter(object):
             self.__storage = None
         else:
             # Fetch the config
-            with open(os.path.join(path, IndexWriter.CONFIG_FILE), 'r') as f:
+            with open(os.path.join(path, IndexWriter.CONFIG_FILE), 'rb') as f:
                 self.__config = IndexConfig.loads(f.read())
             self.__storage = self.__config.storage_writer_cls(path, create=False)
             self.__schema = self.__config.schema
@@ -293,7 +305,7 @@ class IndexWriter(object):
             logger.debug("Index write lock acquired for {}".format(self._path))
             if not created:
                 # Store config
-                with open(os.path.join(self._path, IndexWriter.CONFIG_FILE), 'w') as f:
+                with open(os.path.join(self._path, IndexWriter.CONFIG_FILE), 'wb') as f:
                     f.write(self.__config.dumps())
                 # Initialize storage
                 storage = self.__config.storage_writer_cls(self._path, create=True)
@@ -374,8 +386,10 @@ class IndexWriter(object):
 
         """
         logger.debug('Adding document')
-        schema_fields = self.__schema.items()
-        sentence_tokenizer = nltk.data.load('tokenizers/punkt/english.pickle')
+        schema = self.__schema
+        unstructured_fields = schema.get_indexed_unstructured_fields()
+        stored_fields = [field_name for field_name in schema.get_stored_fields() if field_name in fields]
+        sentence_tokenizer = _get_sentence_tokenizer()
 
         # Build the frames by performing required analysis.
         frames = {}  # Frame data:: field_name -> [frame1, frame2, frame3]
@@ -383,99 +397,121 @@ class IndexWriter(object):
 
         metadata = {}  # Inverted frame metadata:: field_name -> field_value
 
-        # Shell frame includes all non-indexed and categorical fields
-        shell_frame = {}
-        for field_name, field in schema_fields:
-            if (not field.indexed or field.categorical) and field.stored and field_name in fields:
-                shell_frame[field_name] = fields[field_name]
+        # Shell frame includes all stored non-indexed and categorical fields
+        shell_frame = {
+            field_name: fields[field_name] for field_name in stored_fields if field_name not in unstructured_fields
+        }
+
+        # Decode (and check) all the text fields before analysing anything, so a document that can't be decoded fails
+        # straight away instead of after the fields before it have been tokenized.
+        decoded_fields = {}  # field_name -> decoded text, for fields that were given as bytes
+        expected_types = (str, bytes, unicode)
+        for field_name in unstructured_fields:
+            field_data = fields.get(field_name)
+            if field_data is None:
+                continue
+            if isinstance(field_data, str) or isinstance(field_data, bytes):
+                try:
+                    decoded_fields[field_name] = field_data.decode(encoding, encoding_errors)
+                except UnicodeError as e:
+                    raise IndexError("Couldn't decode the {} field - {}".format(field_name, e))
+            elif type(field_data) not in expected_types:
+                raise TypeError("Expected str or bytes or unicode for text field {} but got {}".
+                                format(field_name, type(field_data)))
 
         # Tokenize fields that need it
         logger.debug('Starting tokenization of document')
         frame_count = 0
 
         # Analyze document level structured fields separately to inject in the frames.
-        for field_name, field in schema_fields:
+        for field_name in schema.get_indexed_categorical_fields():
 
-            if field_name not in fields or fields[field_name] is None \
-                    or not field.indexed or not field.categorical:
+            if fields.get(field_name) is None:
                 # Skip fields not supplied or with empty values for this document.
                 continue
 
             # Record categorical values
-            for token in field.analyse(fields[field_name]):
+            for token in schema[field_name].analyse(fields[field_name]):
                 metadata[field_name] = token.value
 
+        # Every frame carries the same shell fields and document metadata, so serialise them once and splice them onto
+        # each frame's own JSON. The closing brace of this fragment closes the frame object.
+        frame_shell_json = b',' + json.dumps(dict(shell_frame, _metadata=metadata))[1:]
+
         # Now just the unstructured fields
-        for field_name, field in schema_fields:
+        # One instance of each term value seen in this document, so repeated terms share a single (unicode) string
+        # rather than each occurrence keeping its own copy alive in the positions dicts. Python 2 can't intern unicode.
+        canonical_terms = {}
+        canonical_term = canonical_terms.setdefault
+        for field_name in unstructured_fields:
 
-            if field_name not in fields or fields[field_name] is None \
-                    or not field.indexed or field.categorical:
+            if fields.get(field_name) is None:
                 continue
+            field = schema[field_name]
 
             # Start the index for this field
-            frames[field_name] = []
+            field_frames = []  # Frame dicts, serialised together once the whole field has been analysed
             term_positions[field_name] = []
+            # Analysis of each distinct sentence in this field as a (token count, [(position, term), ...]) tuple, where
+            # stopped tokens are left out of the list. Repeated sentences (boilerplate, signatures etc.) are only
+            # analysed once per document.
+            sentence_terms = {}
 
             # Index non-categorical fields
-            field_data = fields[field_name]
-            expected_types = (str, bytes, unicode)
-            if isinstance(field_data, str) or isinstance(field_data, bytes):
-                try:
-                    field_data = fields[field_name] = field_data.decode(encoding, encoding_errors)
-                except UnicodeError as e:
-                    raise IndexError("Couldn't decode the {} field - {}".format(field_name, e))
-            elif type(field_data) not in expected_types:
-                raise TypeError("Expected str or bytes or unicode for text field {} but got {}".
-                                format(field_name, type(field_data)))
+            field_data = decoded_fields.get(field_name, fields[field_name])
             if frame_size > 0:
                 # Break up into paragraphs
-                paragraphs = ParagraphTokenizer().tokenize(field_data)
+                paragraphs = _paragraph_tokenizer.tokenize(field_data)
             else:
                 # Otherwise, the whole document is considered as one paragraph
                 paragraphs = [Token(field_data)]
 
+            # Hoisted out of the frame loops below
+            analyse = field.analyse
+            stored = field.stored
+
             for paragraph in paragraphs:
                 # Next we need the sentences grouped by frame
                 if frame_size > 0:
                     sentences = sentence_tokenizer.tokenize(paragraph.value, realign_boundaries=True)
-                    sentences_by_frames = [sentences[i:i + frame_size]
-                                           for i in xrange(0, len(sentences), frame_size)]
+                    sentences_by_frames = (sentences[i:i + frame_size]
+                                           for i in xrange(0, len(sentences), frame_size))
                 else:
                     sentences_by_frames = [[paragraph.value]]
                 for sentence_list in sentences_by_frames:
                     token_position = 0
+                    positions = {}  # term -> [position, position, ...]
                     # Build our frames
                     frame = {
                         '_field': field_name,
-                        '_positions': {},
+                        '_positions': positions,
                         '_sequence_number': frame_count,
-                        '_metadata': metadata  # Inject the document level structured data into the frame
                     }
-                    if field.stored:
+                    if stored:
                         frame['_text'] = " ".join(sentence_list)
                     for sentence in sentence_list:
-                        # Tokenize and index
-                        tokens = field.analyse(sentence)
-
-                        # Record positional information
-                        for token in tokens:
-                            # Add to the list of terms we have seen if it isn't already there.
-                            if not token.stopped:
-                                # Record word positions
-                                try:
-                                    frame['_positions'][token.value].append(token_position)
-                                except KeyError:
-                                    frame['_positions'][token.value] = [token_position]
-
-                            token_position += 1
-
-                    # Build the final frame and add to the index
-                    frame.update(shell_frame)
-                    # Serialised representation of the frame
-                    frames[field_name].append(json.dumps(frame))
+                        # Tokenize and analyse. Tokens are reused by the analyser so we keep their values, not them.
+                        analysed = sentence_terms.get(sentence)
+                        if analysed is None:
+                            values = [None if token.stopped else canonical_term(token.value, token.value)
+                                      for token in analyse(sentence)]
+                            terms = [(position, value) for position, value in enumerate(values) if value is not None]
+                            analysed = sentence_terms[sentence] = (len(values), terms)
+                        num_tokens, terms = analysed
+
+                        # Record word positions, offset by the tokens in the preceding sentences of this frame
+                        for position, term in terms:
+                            positions.setdefault(term, []).append(token_position + position)
+                        token_position += num_tokens
+
+                    field_frames.append(frame)
 
                     # Generate the term-frequency vector for the frame:
-                    term_positions[field_name].append(frame['_positions'])
+                    term_positions[field_name].append(positions)
+
+            # Serialised representation of the final frames (with the shell fields and metadata injected)
+            dumps = json.dumps
+            frames[field_name] = [dumps(field_frame)[:-1] + frame_shell_json for field_frame in field_frames]
 
         # Currently only frames are searchable. That means if a schema contains no text fields it isn't searchable
         # at all. This block constructs a surrogate frame for storage in a catchall container to handle this case.
@@ -484,25 +520,22 @@ class IndexWriter(object):
                 '_field': '',  # There is no text field
                 '_positions': {},
                 '_sequence_number': frame_count,
-                '_metadata': metadata
             }
-            frame.update(shell_frame)
+            frame_json = json.dumps(frame)[:-1] + frame_shell_json
             try:
-                frames[''].append(json.dumps(frame))
+                frames[''].append(frame_json)
             except KeyError:
-                frames[''] = [json.dumps(frame)]
+                frames[''] = [frame_json]
             try:
                 term_positions[''].append(frame['_positions'])
             except:
                 term_positions[''] = [frame['_positions']]
 
-        # Finally add the document to storage.
-        doc_fields = {}
-
-        for field_name, field in schema_fields:
-            if field.stored and field_name in fields:
-                # Only record stored fields against the document
-                doc_fields[field_name] = fields[field_name]
+        # Finally add the document to storage. Only record stored fields against the document.
+        doc_fields = {field_name: fields[field_name] for field_name in stored_fields}
+        for field_name, field_data in decoded_fields.iteritems():
+            if field_name in doc_fields:
+                doc_fields[field_name] = field_data
 
         document = json.dumps(doc_fields)
 
@@ -583,7 +616,7 @@ class IndexWriter(object):
 
         self.__config.schema = self.__schema
         # Save updated schema
-        with open(os.path.join(self._path, IndexWriter.CONFIG_FILE), 'w') as f:
+        with open(os.path.join(self._path, IndexWriter.CONFIG_FILE), 'wb') as f:
             f.write(self.__config.dumps())
 
     def set_setting(self, name, value):
@@ -639,7 +672,7 @@ class IndexReader(object):
         """
         self.__path = path
         try:
-            with open(os.path.join(path, IndexWriter.CONFIG_FILE), "r") as f:
+            with open(os.path.join(path, IndexWriter.CONFIG_FILE), "rb") as f:
                 self.__config = IndexConfig.loads(f.read())
             self.__storage = self.__config.storage_reader_cls(path)
         except StorageNotFoundError:
@@ -1461,7 +1494,7 @@ def find_bi_gram_words(frames, min_count=5, threshold=40.0):
     candidate_bi_grams = nltk.probability.FreqDist()
     uni_gram_frequencies = nltk.probability.FreqDist()
     bi_gram_analyser = PotentialBiGramAnalyser()
-    sentence_tokenizer = nltk.data.load('tokenizers/punkt/english.pickle')
+    sentence_tokenizer = _get_sentence_tokenizer()
     num_frames = 0
 
     for _, frame in frames:
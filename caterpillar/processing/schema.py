@@ -7,12 +7,13 @@ schema and also provides a bunch of utility functions for working with schemas a
 """
 from __future__ import absolute_import, division
 
+import bisect
 import csv
+import itertools
 import re
+import string
 import sys
 
-import regex
-
 from caterpillar.processing.analysis.analyse import BiGramAnalyser, EverythingAnalyser, \
     DefaultAnalyser, DateTimeAnalyser
 from caterpillar.processing.analysis.tokenize import Token
@@ -22,6 +23,11 @@ class FieldConfigurationError(Exception):
     pass
 
 
+def _intern_name(name):
+    """Intern field ``name`` to speed up repeated dict lookups. Only byte strings can be interned on Python 2."""
+    return intern(name) if type(name) is str else name
+
+
 class FieldType(object):
     """
     Represents a field configuration. :class:`.Schema`s are built out of fields.
@@ -51,11 +57,25 @@ class FieldType(object):
         self._indexed = indexed
         self._categorical = categorical
         self._stored = stored
+        self._op_table = self._build_op_table()
+
+    def __getstate__(self):
+        # Bound methods can't be pickled, so the operator table is rebuilt on unpickling instead.
+        state = self.__dict__.copy()
+        state.pop('_op_table', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._op_table = self._build_op_table()
+
+    def _build_op_table(self):
+        """Returns a dict mapping each operator in :const:`FieldType.FIELD_OPS` to the bound method implementing it."""
+        return {operator: getattr(self, method_name) for operator, method_name in FieldType.FIELD_OPS.iteritems()}
 
     def analyse(self, value):
-        """Analyse ``value``, returning a :class:`caterpillar.processing.analysis.tokenize.Token` generator."""
-        for token in self._analyser.analyse(value):
-            yield token
+        """Analyse ``value``, returning an iterable of :class:`caterpillar.processing.analysis.tokenize.Token`."""
+        return self._analyser.analyse(value)
 
     @property
     def categorical(self):
@@ -74,8 +94,7 @@ class FieldType(object):
         Evaluate ``operator`` (str from :const:`FieldType.FIELD_OPS`) on operands ``value1`` and ``value2``.
 
         """
-        op_method = getattr(self, FieldType.FIELD_OPS[operator])
-        return op_method(value1, value2)
+        return self._op_table[operator](value1, value2)
 
     def equals(self, value1, value2):
         """Returns whether ``value1`` is equal to ``value2``."""
@@ -114,7 +133,7 @@ class CategoricalFieldType(FieldType):
 
     def value_of(self, raw_value):
         """Return the value of ``raw_value`` after being processed by this field type's analyse method."""
-        return list(self.analyse(raw_value))[0].value
+        return next(iter(self.analyse(raw_value))).value
 
     def equals(self, value1, value2):
         return self.value_of(value1) == self.value_of(value2)
@@ -129,6 +148,10 @@ class ID(CategoricalFieldType):
     def __init__(self, indexed=False, stored=True):
         super(ID, self).__init__(indexed=indexed, stored=stored)
 
+    def value_of(self, raw_value):
+        # The EverythingAnalyser returns the value untouched, so skip the analyser.
+        return raw_value
+
 
 class NUMERIC(CategoricalFieldType):
     """Special field type that lets you index ints or floats."""
@@ -143,13 +166,16 @@ class NUMERIC(CategoricalFieldType):
         super(NUMERIC, self).__init__(analyser=None, indexed=indexed, stored=stored)
 
     def analyse(self, value):
+        yield Token(self.value_of(value))
+
+    def value_of(self, raw_value):
+        # Convert directly rather than pulling a Token out of analyse().
         try:
-            yield Token(self._num_type(value))
-        except (TypeError, ValueError) as e:
-            if value is None or len(value) == 0:
-                yield Token(self._default_value)
-            else:
-                raise e
+            return self._num_type(raw_value)
+        except (TypeError, ValueError):
+            if raw_value is None or len(raw_value) == 0:
+                return self._default_value
+            raise
 
     def gt(self, value1, value2):
         return self.value_of(value1) > self.value_of(value2)
@@ -175,7 +201,10 @@ class BOOLEAN(CategoricalFieldType):
         super(BOOLEAN, self).__init__(analyser=None, indexed=indexed, stored=stored)
 
     def analyse(self, value):
-        yield Token(bool(value))
+        yield Token(self.value_of(value))
+
+    def value_of(self, raw_value):
+        return bool(raw_value)
 
 
 class TEXT(FieldType):
@@ -197,8 +226,43 @@ class CATEGORICAL_TEXT(CategoricalFieldType):
     def analyse(self, value):
         yield Token(value.strip())
 
+    # Characters with a special meaning in a regex, wildcards without any of them are plain prefixes
+    REGEX_META_CHARS = frozenset('.^$*+?{}[]\\|()')
+    # Wildcard match functions, shared by all instances and cleared when full (like the re module's own cache)
+    WILDCARD_CACHE_SIZE = 1024
+    _wildcard_cache = {}
+
     def equals_wildcard(self, value, wildcard_value):
-        return re.match(wildcard_value, value) is not None
+        """
+        Returns whether the start of ``value`` matches regex ``wildcard_value``.
+
+        """
+        matches = CATEGORICAL_TEXT._wildcard_cache.get(wildcard_value)
+        if matches is None:
+            matches = CATEGORICAL_TEXT._compile_wildcard(wildcard_value)
+        return matches(value)
+
+    @staticmethod
+    def _compile_wildcard(wildcard_value):
+        """Compile ``wildcard_value`` into a match function, caching the function."""
+        pattern = re.compile(wildcard_value)
+        if CATEGORICAL_TEXT.REGEX_META_CHARS.isdisjoint(wildcard_value):
+            # A literal only matches values starting with it, so the regex engine isn't needed. Mixing str and unicode
+            # would implicitly decode as ascii, so values of the other string type still go through the pattern.
+            literal_type = type(wildcard_value)
+
+            def matches(value):
+                if type(value) is literal_type:
+                    return value.startswith(wildcard_value)
+                return pattern.match(value) is not None
+        else:
+            def matches(value):
+                return pattern.match(value) is not None
+        cache = CATEGORICAL_TEXT._wildcard_cache
+        if len(cache) >= CATEGORICAL_TEXT.WILDCARD_CACHE_SIZE:
+            cache.clear()
+        cache[wildcard_value] = matches
+        return matches
 
 
 class DATETIME(FieldType):
@@ -215,7 +279,7 @@ class DATETIME(FieldType):
 
     def value_of(self, raw_value):
         """Return the value of ``raw_value`` after being processed by this field type's analyse method."""
-        return list(self.analyse(raw_value))[0].value
+        return next(iter(self.analyse(raw_value))).value
 
     def gt(self, value1, value2):
         return self.value_of(value1) > self.value_of(value2)
@@ -233,6 +297,10 @@ class DATETIME(FieldType):
         return self.value_of(value1) == self.value_of(value2)
 
 
+# The field types defined here, so Schema.add can accept them without walking the MRO via isinstance()
+_FIELD_TYPES = frozenset([FieldType, CategoricalFieldType, ID, NUMERIC, BOOLEAN, TEXT, CATEGORICAL_TEXT, DATETIME])
+
+
 class Schema(object):
     """
     Represents the collection of fields in an index. Maps field names to FieldType objects which define the behavior of
@@ -254,14 +322,57 @@ class Schema(object):
 
         """
 
-        self._fields = {}
+        self._clear_fields()
+
+        for name, field_type in fields.iteritems():
+            self.add(name, field_type)
 
-        for name in sorted(fields.keys()):
-            self.add(name, fields[name])
+    # Attributes derived from _fields, which aren't pickled and are rebuilt by __setstate__ instead
+    _NAME_LISTS = ('_sorted_names', '_indexed_text_fields', '_indexed_structured_fields', '_indexed_categorical_fields',
+                   '_indexed_unstructured_fields', '_stored_fields')
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for attribute in Schema._NAME_LISTS:
+            state.pop(attribute, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        fields = self._fields
+        self._clear_fields()
+        for name, field in fields.iteritems():
+            self._add_field(name, field)
+
+    def _clear_fields(self):
+        self._fields = {}
+        # Field name lists, kept sorted by _add_field() so they never need to be rebuilt or re-sorted.
+        self._sorted_names = []
+        self._indexed_text_fields = []
+        self._indexed_structured_fields = []
+        self._indexed_categorical_fields = []
+        self._indexed_unstructured_fields = []
+        self._stored_fields = []
+
+    def _add_field(self, name, field):
+        """Record ``field`` under ``name`` and in each of the name lists it belongs to."""
+        self._fields[name] = field
+        bisect.insort(self._sorted_names, name)
+        if field.stored:
+            bisect.insort(self._stored_fields, name)
+        if field.indexed:
+            if type(field) is TEXT:
+                bisect.insort(self._indexed_text_fields, name)
+            else:
+                bisect.insort(self._indexed_structured_fields, name)
+            if field.categorical:
+                bisect.insort(self._indexed_categorical_fields, name)
+            else:
+                bisect.insort(self._indexed_unstructured_fields, name)
 
     def __iter__(self):
         """Returns the field objects in this schema."""
-        return iter(self._fields.values())
+        return (self._fields[name] for name in self._sorted_names)
 
     def __getitem__(self, name):
         """Returns the field associated with the given field name."""
@@ -275,29 +386,41 @@ class Schema(object):
         return len(self._fields)
 
     def __contains__(self, field_name):
-        """Returns True if a field by the given name is in this schema."""
-        # Defined in terms of __getitem__ so that there's only one method to override to provide dynamic fields
-        try:
-            field = self[field_name]
-            return field is not None
-        except KeyError:
-            return False
+        """
+        Returns True if a field by the given name is in this schema.
+
+        Subclasses that override :meth:`__getitem__` to provide dynamic fields must also override this method.
+
+        """
+        return field_name in self._fields
 
     def items(self):
         """Returns a list of ``("field_name", field_object)`` pairs for the fields in this schema."""
-        return sorted(self._fields.items())
+        return [(name, self._fields[name]) for name in self._sorted_names]
 
     def names(self):
         """Returns a list of the names of the fields in this schema."""
-        return sorted(self._fields.keys())
+        return list(self._sorted_names)
 
     def get_indexed_text_fields(self):
         """Returns a list of the indexed text fields."""
-        return [name for name, field in self._fields.iteritems() if field.indexed and type(field) == TEXT]
+        return list(self._indexed_text_fields)
 
     def get_indexed_structured_fields(self):
         """Returns a list of the indexed structured (non-text) fields."""
-        return [name for name, field in self._fields.iteritems() if field.indexed and type(field) != TEXT]
+        return list(self._indexed_structured_fields)
+
+    def get_indexed_categorical_fields(self):
+        """Returns a list of the indexed categorical fields."""
+        return list(self._indexed_categorical_fields)
+
+    def get_indexed_unstructured_fields(self):
+        """Returns a list of the indexed unstructured (non-categorical) fields."""
+        return list(self._indexed_unstructured_fields)
+
+    def get_stored_fields(self):
+        """Returns a list of the stored fields."""
+        return list(self._stored_fields)
 
     def add(self, name, field_type):
         """
@@ -324,10 +447,10 @@ class Schema(object):
                 e = sys.exc_info()[1]
                 raise FieldConfigurationError("Error: {} instantiating field {}: {}".format(e, name, field_type))
 
-        if not isinstance(field_type, FieldType):
+        if type(field_type) not in _FIELD_TYPES and not isinstance(field_type, FieldType):
             raise FieldConfigurationError("{} is not a FieldType object".format(field_type))
 
-        self._fields[name] = field_type
+        self._add_field(_intern_name(name), field_type)
 
 
 class ColumnDataType(object):
@@ -356,6 +479,7 @@ class ColumnSpec(object):
     This includes the column's name and its type.
 
     """
+    __slots__ = ('name', 'field_name', 'type')
 
     def __init__(self, name, type):
         """
@@ -367,9 +491,19 @@ class ColumnSpec(object):
 
         """
         self.name = name
-        self.field_name = name.replace(' ', '')
+        self.field_name = _intern_name(name.replace(' ', ''))
         self.type = type
 
+    def __getstate__(self):
+        # Classes with __slots__ and no __dict__ can't be pickled with protocols 0 and 1 without this.
+        return {slot: getattr(self, slot) for slot in ColumnSpec.__slots__}
+
+    def __setstate__(self, state):
+        for slot, value in state.iteritems():
+            setattr(self, slot, value)
+        # Interning doesn't survive pickling.
+        self.field_name = _intern_name(self.field_name)
+
 
 class CsvSchema(object):
     """
@@ -384,11 +518,20 @@ class CsvSchema(object):
     sample_rows -- A list of row data that was used to generate the schema.
 
     """
-    def __init__(self, columns, has_header, dialect, sample_rows=[]):
+    __slots__ = ('columns', 'has_header', 'dialect', 'sample_rows')
+
+    def __init__(self, columns, has_header, dialect, sample_rows=None):
         self.columns = columns
         self.has_header = has_header
         self.dialect = dialect
-        self.sample_rows = sample_rows
+        self.sample_rows = sample_rows if sample_rows is not None else []
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in CsvSchema.__slots__}
+
+    def __setstate__(self, state):
+        for slot, value in state.iteritems():
+            setattr(self, slot, value)
 
     def as_index_schema(self, bi_grams=None, stopword_list=None):
         """
@@ -400,26 +543,25 @@ class CsvSchema(object):
         stopword_list -- A list of stop words to use instead of default English list.
 
         """
-        schema = Schema()
-        for col in self.columns:
-
-            if col.type == ColumnDataType.IGNORE:
-                continue
-
-            elif col.type == ColumnDataType.FLOAT:
-                schema.add(col.field_name, NUMERIC(num_type=float))
-
-            elif col.type == ColumnDataType.INTEGER:
-                schema.add(col.field_name, NUMERIC(num_type=int))
+        # Analysers don't hold any per-field state, so all TEXT columns share one instance.
+        if bi_grams is not None:
+            text_analyser = BiGramAnalyser(bi_grams, stopword_list=stopword_list)
+        else:
+            text_analyser = DefaultAnalyser(stopword_list=stopword_list)
 
-            elif col.type == ColumnDataType.STRING:
-                schema.add(col.field_name, CATEGORICAL_TEXT)
+        # IGNORE columns have no factory and so don't appear in the schema.
+        field_factories = {
+            ColumnDataType.FLOAT: lambda: NUMERIC(num_type=float),
+            ColumnDataType.INTEGER: lambda: NUMERIC(num_type=int),
+            ColumnDataType.STRING: CATEGORICAL_TEXT,
+            ColumnDataType.TEXT: lambda: TEXT(analyser=text_analyser),
+        }
 
-            elif col.type == ColumnDataType.TEXT:
-                if bi_grams is not None:
-                    schema.add(col.field_name, TEXT(analyser=BiGramAnalyser(bi_grams, stopword_list=stopword_list)))
-                else:
-                    schema.add(col.field_name, TEXT(analyser=DefaultAnalyser(stopword_list=stopword_list)))
+        schema = Schema()
+        for col in self.columns:
+            factory = field_factories.get(col.type)
+            if factory is not None:
+                schema.add(col.field_name, factory())
 
         return schema
 
@@ -431,17 +573,34 @@ class CsvSchema(object):
         row -- A list of values for a row.
 
         """
-        row_data = {}
-        i = 0
-        for col in self.columns:
-            if col.type != ColumnDataType.IGNORE:
-                row_data[col.field_name] = row[i]
-            i += 1
-        return row_data
+        ignore = ColumnDataType.IGNORE
+        return {col.field_name: row[i] for i, col in enumerate(self.columns) if col.type != ignore}
 
 
 AVG_WORDS_TEXT = 5  # Minimum number of average words per row to consider a column as text
 NUM_PEEK_ROWS_CSV = 20  # Number of csv rows to consider when generating automatic schema
+_WORD_RE = re.compile(r'\w+')  # Words counted when deciding if a column is text
+# Byte translation table that maps every byte not matched by \w to a space, so the \w+ runs in a byte string can be
+# counted by splitting on whitespace (both loops run in C and no match objects are created).
+_WORD_BYTES = frozenset(string.ascii_letters + string.digits + '_')
+_NON_WORD_BYTES_TO_SPACE = b''.join(chr(i) if chr(i) in _WORD_BYTES else b' ' for i in range(256))
+
+
+def _count_words(value):
+    """Return the number of ``\\w+`` matches in ``value`` (str or unicode)."""
+    if isinstance(value, bytes):
+        return len(value.translate(_NON_WORD_BYTES_TO_SPACE).split())
+    return len(_WORD_RE.findall(value))
+
+
+def _count_column_words(column, limit):
+    """Return the total word count of the cells in ``column``, stopping early once it reaches ``limit``."""
+    total_words = 0
+    for value in column:
+        total_words += _count_words(value)
+        if total_words >= limit:
+            break
+    return total_words
 
 
 def generate_csv_schema(csv_file, delimiter=',', encoding='utf8'):
@@ -449,7 +608,7 @@ def generate_csv_schema(csv_file, delimiter=',', encoding='utf8'):
     Attempt to generate a schema for the csv file automatically.
 
     Required Arguments:
-    csv_file -- The CSV file to generate a schema for.
+    csv_file -- The CSV file to generate a schema for. The file is rewound and the schema generated from its start.
 
     Optional Arguments:
     delimiter -- CSV delimiter character.
@@ -460,41 +619,39 @@ def generate_csv_schema(csv_file, delimiter=',', encoding='utf8'):
     """
     dialect = csv.excel
 
-    # Check for headers
-    has_header = csv_has_header(csv_file, dialect)
-
-    # Now actually read the file
+    # Parse the rows needed for both the header check and the sample just once, from the start of the file
     csv_file.seek(0)
     reader = csv.reader(csv_file, dialect)
+    first_row = next(reader)  # Raises StopIteration for an empty file
+    num_rows = max(NUM_HEADER_CHECK_ROWS_CSV, NUM_PEEK_ROWS_CSV)
+    rows = [first_row]
+    rows.extend(itertools.islice(reader, num_rows))
+
+    # Check for headers
+    has_header = csv_has_header_from_rows(rows[:NUM_HEADER_CHECK_ROWS_CSV + 1])
     headers = []
     if has_header:
-        headers = reader.next()
+        headers = [h.decode(encoding, 'ignore') if isinstance(h, bytes) else h for h in rows[0]]
 
-    # Collect column statistics
-    sample_rows = []
-    column_stats = {}
-    for i in range(NUM_PEEK_ROWS_CSV):
-        try:
-            row = reader.next()
-        except StopIteration:
-            # No more rows
-            break
-        sample_rows.append(row)
-        for j in range(len(row)):
-            col = row[j]
-            if j not in column_stats:
-                column_stats[j] = {'total_words': 0}
-            column_stats[j]['total_words'] += len(regex.findall(r'\w+', col))
+    # Collect the sample rows
+    sample_start = 1 if has_header else 0
+    sample_rows = rows[sample_start:sample_start + NUM_PEEK_ROWS_CSV]
+
+    # Collect column statistics a column at a time over the sample block (short rows are padded with empty cells).
+    # Counting stops once a column has enough words to be text, as further cells can't change its classification.
+    text_words = AVG_WORDS_TEXT * NUM_PEEK_ROWS_CSV
+    column_words = [_count_column_words(column, text_words)
+                    for column in itertools.izip_longest(*sample_rows, fillvalue='')]
 
     # Define columns and generate schema
     columns = []
-    for index, stats in column_stats.items():
+    for index, total_words in enumerate(column_words):
         name = None
         if headers and index < len(headers):
-            name = unicode(headers[index], encoding, errors='ignore')
+            name = headers[index]
         if name is None or len(name) == 0:
             name = str(index + 1)
-        if stats['total_words'] / NUM_PEEK_ROWS_CSV >= AVG_WORDS_TEXT:
+        if total_words / NUM_PEEK_ROWS_CSV >= AVG_WORDS_TEXT:
             # Enough words for a text column
             columns.append(ColumnSpec(name, ColumnDataType.TEXT))
         else:
@@ -505,9 +662,10 @@ def generate_csv_schema(csv_file, delimiter=',', encoding='utf8'):
 
 
 MAX_HEADER_SIZE_PERCENTAGE = 0.33  # Maximum size for header row as a percentage of the average row size
+NUM_HEADER_CHECK_ROWS_CSV = 50  # Number of csv rows after the first to consider when checking for a header
 
 
-def csv_has_header(csv_file, dialect, num_check_rows=50):
+def csv_has_header(csv_file, dialect, num_check_rows=NUM_HEADER_CHECK_ROWS_CSV):
     """
     Custom heuristic for recognising header in CSV files. Intended to be used as an alternative
     for the ``csv.Sniffer.has_header`` method which doesn't work well for mostly-text CSV files.
@@ -523,18 +681,27 @@ def csv_has_header(csv_file, dialect, num_check_rows=50):
     num_check_rows -- The number of rows to analyse (defaults to 50).
 
     """
-    reader = csv.reader(csv_file, dialect)
-    header = reader.next()  # assume first row is header
-    header_size = sum([len(col) for col in header])
+    # We don't read (or parse) past the rows we check.
+    return csv_has_header_from_rows(list(itertools.islice(csv.reader(csv_file, dialect), num_check_rows + 1)))
+
+
+def csv_has_header_from_rows(rows):
+    """
+    Apply the :func:`csv_has_header` heuristic to rows that have already been parsed, so callers that need the rows
+    anyway don't have to parse the file twice.
+
+    Required Arguments:
+    rows -- A list of parsed CSV rows, the first of which is the candidate header row.
+
+    Returns False if there are no rows after the candidate header to compare it with.
+
+    """
+    if len(rows) < 2:
+        return False
+    header_size = sum(map(len, rows[0]))
 
     # Compute average row size
-    total_row_size = 0
-    checked = 0
-    for row in reader:
-        if checked == num_check_rows:
-            break
-        total_row_size += sum([len(col) for col in row])
-        checked += 1
-    avg_row_size = total_row_size / checked
+    total_row_size = sum(sum(map(len, row)) for row in rows[1:])
+    avg_row_size = total_row_size / (len(rows) - 1)
 
     return header_size / avg_row_size <= MAX_HEADER_SIZE_PERCENTAGE
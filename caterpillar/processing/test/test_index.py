@@ -16,7 +16,7 @@ import pytest
 
 from caterpillar import __version__ as version
 from caterpillar.storage import Storage
-from caterpillar.storage.sqlite import SqliteStorage
+from caterpillar.storage.sqlite import SqliteStorage, SqliteWriter
 from caterpillar.processing.analysis.analyse import EverythingAnalyser
 from caterpillar.processing.index import (
     IndexWriter, IndexReader, find_bi_gram_words, IndexConfig, IndexNotFoundError, DocumentNotFoundError,
@@ -26,68 +26,108 @@ from caterpillar.processing.schema import ID, NUMERIC, TEXT, FieldType, Schema
 from caterpillar.test_util import TestAnalyser, TestBiGramAnalyser
 
 
-def test_index_open(index_dir):
-    with open(os.path.abspath('caterpillar/test_resources/alice_test_data.txt'), 'r') as f:
-        data = f.read()
-        analyser = TestAnalyser()
-        writer = IndexWriter(index_dir, IndexConfig(SqliteStorage,
-                             Schema(text1=TEXT(analyser=analyser),
-                                    text2=TEXT(analyser=analyser),
-                                    document=TEXT(analyser=analyser, indexed=False),
-                                    flag=FieldType(analyser=EverythingAnalyser(),
-                                    indexed=True, categorical=True))))
+def _read_test_resource(name):
+    with open(os.path.abspath(os.path.join('caterpillar/test_resources', name)), 'r') as f:
+        return f.read()
 
-        # Just initialise the index to check the first revision number
-        with writer:
-            pass
 
-        with IndexReader(index_dir) as reader:
-            assert reader.revision == (0, 0, 0, 0)
+@pytest.fixture(scope='module')
+def alice_test_data():
+    """The contents of alice_test_data.txt, read once for the module."""
+    return _read_test_resource('alice_test_data.txt')
 
-        with writer:
-            writer.add_document(text1=data, text2=data, document='alice.txt', flag=True, frame_size=2)
 
-        # Identical text fields should generate the same frames and frequencies
-        with IndexReader(index_dir) as reader:
-            assert sum(1 for _ in reader.get_frequencies('text1')) == 500
-            assert sum(1 for _ in reader.get_frequencies('text2')) == 500
-            assert reader.get_term_frequency('Alice', 'text1') == 23
-            assert reader.get_term_frequency('Alice', 'text2') == 23
-            assert reader.get_document_count() == 1
-            assert reader.get_frame_count('text1') == 52
-            assert reader.get_frame_count('text2') == 52
-            assert isinstance(reader.get_schema()['text1'], TEXT)
-            assert isinstance(reader.get_schema()['text2'], TEXT)
-            assert reader.revision == (1, 1, 0, 104)
-
-            with pytest.raises(DocumentNotFoundError):
-                reader.get_frame(10000, 'text1`')
-
-        # Adding the same document twice should double the frame, term_frequencies and document counts
-        with writer:
-            writer.add_document(text1=data, text2=data, document='alice.txt', flag=True, frame_size=2)
+@pytest.fixture(scope='module')
+def alice_data():
+    """The contents of alice.txt, read once for the module."""
+    return _read_test_resource('alice.txt')
 
-        with IndexReader(index_dir) as reader:
-            assert sum(1 for _ in reader.get_frequencies('text1')) == 500
-            assert reader.get_term_frequency('Alice', 'text1') == 46
-            assert reader.get_document_count() == 2
-            assert reader.get_frame_count('text1') == 104
-            assert isinstance(reader.get_schema()['text1'], TEXT)
-            assert reader.revision == (2, 2, 0, 208)
-
-        path = tempfile.mkdtemp()
-        new_dir = os.path.join(path, "no_reader")
-        try:
-            with pytest.raises(IndexNotFoundError):
-                IndexWriter(new_dir, IndexConfig(SqliteStorage, Schema(text=TEXT)))
-                IndexReader(new_dir)  # begin() was never called on the writer
-            with pytest.raises(IndexNotFoundError):
-                with IndexWriter(new_dir, IndexConfig(SqliteStorage, Schema(text=TEXT))) as writer:
-                    pass
-                os.remove(os.path.join(new_dir, "storage.db"))
-                IndexReader(new_dir)  # The written container no longer exists
-        finally:
-            shutil.rmtree(path)
+
+@pytest.fixture(scope='module')
+def alice_index_template(request, alice_test_data):
+    """Index the alice test data once into a ``Schema(text=TEXT)`` index that tests can copy."""
+    path = tempfile.mkdtemp()
+
+    def clean():
+        shutil.rmtree(path)
+
+    request.addfinalizer(clean)
+    template_dir = os.path.join(path, "alice_index")
+    with IndexWriter(template_dir, IndexConfig(SqliteStorage, Schema(text=TEXT))) as writer:
+        writer.add_document(text=alice_test_data)
+    return template_dir
+
+
+@pytest.fixture
+def alice_index_dir(index_dir, alice_index_template):
+    """A private copy of the indexed alice test data, so tests are free to modify it."""
+    shutil.copytree(alice_index_template, index_dir)
+    return index_dir
+
+
+def test_index_open(index_dir, alice_test_data):
+    analyser = TestAnalyser()
+    writer = IndexWriter(index_dir, IndexConfig(SqliteStorage,
+                         Schema(text1=TEXT(analyser=analyser),
+                                text2=TEXT(analyser=analyser),
+                                document=TEXT(analyser=analyser, indexed=False),
+                                flag=FieldType(analyser=EverythingAnalyser(),
+                                indexed=True, categorical=True))))
+
+    # Just initialise the index to check the first revision number
+    with writer:
+        pass
+
+    with IndexReader(index_dir) as reader:
+        assert reader.revision == (0, 0, 0, 0)
+
+    with writer:
+        writer.add_document(text1=alice_test_data, text2=alice_test_data, document='alice.txt', flag=True, frame_size=2)
+
+    # Identical text fields should generate the same frames and frequencies
+    with IndexReader(index_dir) as reader:
+        assert reader.get_vocab_size('text1') == 500
+        assert reader.get_vocab_size('text2') == 500
+        assert len(dict(reader.get_frequencies('text1'))) == 500
+        assert len(dict(reader.get_frequencies('text2'))) == 500
+        assert reader.get_term_frequency('Alice', 'text1') == 23
+        assert reader.get_term_frequency('Alice', 'text2') == 23
+        assert reader.get_document_count() == 1
+        assert reader.get_frame_count('text1') == 52
+        assert reader.get_frame_count('text2') == 52
+        assert isinstance(reader.get_schema()['text1'], TEXT)
+        assert isinstance(reader.get_schema()['text2'], TEXT)
+        assert reader.revision == (1, 1, 0, 104)
+
+        with pytest.raises(DocumentNotFoundError):
+            reader.get_frame(10000, 'text1`')
+
+    # Adding the same document twice should double the frame, term_frequencies and document counts
+    with writer:
+        writer.add_document(text1=alice_test_data, text2=alice_test_data, document='alice.txt', flag=True, frame_size=2)
+
+    with IndexReader(index_dir) as reader:
+        assert reader.get_vocab_size('text1') == 500
+        assert len(dict(reader.get_frequencies('text1'))) == 500
+        assert reader.get_term_frequency('Alice', 'text1') == 46
+        assert reader.get_document_count() == 2
+        assert reader.get_frame_count('text1') == 104
+        assert isinstance(reader.get_schema()['text1'], TEXT)
+        assert reader.revision == (2, 2, 0, 208)
+
+    path = tempfile.mkdtemp()
+    new_dir = os.path.join(path, "no_reader")
+    try:
+        with pytest.raises(IndexNotFoundError):
+            IndexWriter(new_dir, IndexConfig(SqliteStorage, Schema(text=TEXT)))
+            IndexReader(new_dir)  # begin() was never called on the writer
+        with pytest.raises(IndexNotFoundError):
+            with IndexWriter(new_dir, IndexConfig(SqliteStorage, Schema(text=TEXT))) as writer:
+                pass
+            os.remove(os.path.join(new_dir, "storage.db"))
+            IndexReader(new_dir)  # The written container no longer exists
+    finally:
+        shutil.rmtree(path)
 
     with pytest.raises(IndexNotFoundError):
         IndexReader("fake")
@@ -107,7 +147,7 @@ def test_index_settings(index_dir):
     with IndexReader(index_dir) as reader:
         assert reader.get_setting('test')
         assert not reader.get_setting('is_testing_fun')
-        settings = {k: v for k, v in reader.get_settings(['test', 'is_testing_fun'])}
+        settings = dict(reader.get_settings(['test', 'is_testing_fun']))
         assert len(settings) == 2
         assert 'test' in settings
         with pytest.raises(SettingNotFoundError):
@@ -126,194 +166,196 @@ def test_index_config():
     with pytest.raises(ValueError):
         IndexConfig.loads(" ")
 
+    conf = IndexConfig(SqliteStorage, Schema(text=TEXT, num=NUMERIC(indexed=True)))
+    loaded = IndexConfig.loads(conf.dumps())
+    assert loaded.storage_reader_cls is SqliteStorage.reader
+    assert loaded.schema.names() == ['num', 'text']
+    assert loaded.schema.get_indexed_structured_fields() == ['num']
+
 
-def test_index_alice(index_dir):
+def test_index_alice(index_dir, alice_test_data):
     """Whole bunch of functional tests on the index."""
-    with open(os.path.abspath('caterpillar/test_resources/alice_test_data.txt'), 'r') as f:
-        data = f.read()
-        analyser = TestAnalyser()
-        writer = IndexWriter(index_dir, IndexConfig(SqliteStorage,
-                                                    Schema(text=TEXT(analyser=analyser),
-                                                           document=TEXT(analyser=analyser, indexed=False),
-                                                           blank=NUMERIC(indexed=True), ref=ID(indexed=True))))
-        with writer:
-            writer.add_document(text=data, document='alice.txt', blank=None, ref=123, frame_size=2)
+    analyser = TestAnalyser()
+    writer = IndexWriter(index_dir, IndexConfig(SqliteStorage,
+                                                Schema(text=TEXT(analyser=analyser),
+                                                       document=TEXT(analyser=analyser, indexed=False),
+                                                       blank=NUMERIC(indexed=True), ref=ID(indexed=True))))
+    with writer:
+        writer.add_document(text=alice_test_data, document='alice.txt', blank=None, ref=123, frame_size=2)
 
-        doc_id = writer.last_committed_documents[0]
+    doc_id = writer.last_committed_documents[0]
 
-        with IndexReader(index_dir) as reader:
-            assert sum(1 for _ in reader.get_term_positions('nice', 'text')) == 3
-            assert sum(1 for _ in reader.get_term_positions('key', 'text')) == 5
+    with IndexReader(index_dir) as reader:
+        assert len(reader.get_term_positions('nice', 'text')) == 3
+        assert len(reader.get_term_positions('key', 'text')) == 5
 
-            assoc_index = {term: values for term, values in reader.get_associations_index('text')}
-            assert 'Alice' in assoc_index
+        assoc_index = dict(reader.get_associations_index('text'))
+        assert 'Alice' in assoc_index
 
-            assert reader.get_term_association('Alice', 'poor', 'text') == \
-                reader.get_term_association('poor', 'Alice', 'text') == 3
-            assert reader.get_term_association('key', 'golden', 'text') == \
-                reader.get_term_association('golden', 'key', 'text') == 3
+        assert reader.get_term_association('Alice', 'poor', 'text') == \
+            reader.get_term_association('poor', 'Alice', 'text') == 3
+        assert reader.get_term_association('key', 'golden', 'text') == \
+            reader.get_term_association('golden', 'key', 'text') == 3
 
-            with pytest.raises(KeyError):
-                reader.get_term_association('nonsenseterminthisindex', 'otherterm', 'text')
+        with pytest.raises(KeyError):
+            reader.get_term_association('nonsenseterminthisindex', 'otherterm', 'text')
 
-            with pytest.raises(KeyError):
-                reader.get_term_association('Alice', 'nonsenseterminthisindex', 'text')
+        with pytest.raises(KeyError):
+            reader.get_term_association('Alice', 'nonsenseterminthisindex', 'text')
 
-            with pytest.raises(KeyError):
-                reader.get_term_positions('nonseneterminthisindex', 'text')
+        with pytest.raises(KeyError):
+            reader.get_term_positions('nonseneterminthisindex', 'text')
 
-            assert reader.get_vocab_size('text') == sum(1 for _ in reader.get_frequencies('text')) == 500
-            assert reader.get_term_frequency('Alice', 'text') == 23
-            assert reader.revision == (1, 1, 0, 52)
+        assert reader.get_vocab_size('text') == sum(1 for _ in reader.get_frequencies('text')) == 500
+        assert reader.get_term_frequency('Alice', 'text') == 23
+        assert reader.revision == (1, 1, 0, 52)
 
-        with IndexWriter(index_dir) as writer:
-            writer.add_fields(field1=TEXT, field2=NUMERIC(indexed=True))
+    with IndexWriter(index_dir) as writer:
+        writer.add_fields(field1=TEXT, field2=NUMERIC(indexed=True))
 
-        with IndexReader(index_dir) as reader:
-            schema = reader.get_schema()
-            assert 'field1' in schema
-            assert 'field2' in schema
+    with IndexReader(index_dir) as reader:
+        schema = reader.get_schema()
+        assert 'field1' in schema
+        assert 'field2' in schema
 
-        with IndexWriter(index_dir) as writer:
-            writer.delete_document(doc_id)
+    with IndexWriter(index_dir) as writer:
+        writer.delete_document(doc_id)
 
-        assert len(writer.last_deleted_documents) == 1
+    assert len(writer.last_deleted_documents) == 1
 
-        with IndexReader(index_dir) as reader:
-            with pytest.raises(DocumentNotFoundError):
-                reader.get_document(doc_id)
-            assert reader.revision == (2, 1, 1, 52)
+    with IndexReader(index_dir) as reader:
+        with pytest.raises(DocumentNotFoundError):
+            reader.get_document(doc_id)
+        assert reader.revision == (2, 1, 1, 52)
 
-        with IndexWriter(index_dir) as writer:
-            writer.delete_document(doc_id)
+    with IndexWriter(index_dir) as writer:
+        writer.delete_document(doc_id)
 
-        assert len(writer.last_deleted_documents) == 0
+    assert len(writer.last_deleted_documents) == 0
 
-        with IndexReader(index_dir) as reader:
-            assert 'Alice' not in reader.get_frequencies('text')
-            assert 'Alice' not in reader.get_associations_index('text')
-            assert 'Alice' not in reader.get_positions_index('text')
-            assert reader.revision == (2, 1, 1, 52)
+    with IndexReader(index_dir) as reader:
+        # The index yields (term, value) pairs, so bind each one to a dict once to look terms up
+        assert not dict(reader.get_frequencies('text')).get('Alice')
+        assert 'Alice' not in dict(reader.get_associations_index('text'))
+        assert 'Alice' not in dict(reader.get_positions_index('text'))
+        assert reader.revision == (2, 1, 1, 52)
 
+    with IndexWriter(index_dir) as writer:
         # Test not text
-        with IndexWriter(index_dir) as writer:
-            with pytest.raises(TypeError):
-                writer.add_document(text=False, document='alice', frame_size=0)
+        with pytest.raises(TypeError):
+            writer.add_document(text=False, document='alice', frame_size=0)
 
         # Test frame size = 0 (whole document)
-        with IndexWriter(index_dir) as writer:
-            writer.add_document(text=data, document='alice', frame_size=0)
-            writer.add_document(text=unicode("unicode data"), document='test', frame_size=0)
+        writer.add_document(text=alice_test_data, document='alice', frame_size=0)
+        writer.add_document(text=unicode("unicode data"), document='test', frame_size=0)
 
-        with IndexReader(index_dir) as reader:
-            assert reader.get_frame_count('text') == 2
+    with IndexReader(index_dir) as reader:
+        assert reader.get_frame_count('text') == 2
 
 
-def test_index_alice_attributes(index_dir):
+def test_index_alice_attributes(index_dir, alice_test_data):
     """Whole bunch of functional tests on the index."""
-    with open(os.path.abspath('caterpillar/test_resources/alice_test_data.txt'), 'r') as f:
-        data = f.read()
-        analyser = TestAnalyser()
-        writer = IndexWriter(index_dir, IndexConfig(SqliteStorage,
-                                                    Schema(text1=TEXT(analyser=analyser), text2=TEXT,
-                                                           document=TEXT(analyser=analyser, indexed=False),
-                                                           blank=NUMERIC(indexed=True), ref=ID(indexed=True))))
-        with writer:
-            writer.add_document(text1=data, text2=data, document='alice.txt', blank=None, ref=123, frame_size=2)
+    analyser = TestAnalyser()
+    writer = IndexWriter(index_dir, IndexConfig(SqliteStorage,
+                                                Schema(text1=TEXT(analyser=analyser), text2=TEXT,
+                                                       document=TEXT(analyser=analyser, indexed=False),
+                                                       blank=NUMERIC(indexed=True), ref=ID(indexed=True))))
+    with writer:
+        writer.add_document(
+            text1=alice_test_data, text2=alice_test_data, document='alice.txt', blank=None, ref=123, frame_size=2
+        )
 
-        # Label all the frames with some nonsense attributes
-        with IndexReader(index_dir) as reader:
-            frame_ids = list(reader.get_frame_ids('text1'))
+    # Label all the frames with some nonsense attributes
+    with IndexReader(index_dir) as reader:
+        frame_ids = list(reader.get_frame_ids('text1'))
+
+    attribute_index = {}
 
-        attribute_index = {}
+    for f_id in frame_ids:
+        attribute_index[f_id] = {}
+        attribute_index[f_id]['numerical_score'] = f_id // 10
+        if f_id % 3 == 0:
+            attribute_index[f_id]['sentiment'] = 'positive'
+        if f_id % 11 == 0:
+            attribute_index[f_id]['named_entity'] = str(f_id)
 
-        for f_id in frame_ids:
-            attribute_index[f_id] = {}
-            attribute_index[f_id]['numerical_score'] = f_id // 10
+    with writer:
+        writer.append_frame_attributes(attribute_index)
+
+    with IndexReader(index_dir) as reader:
+        text1_attribute_index = list(reader.get_attributes(include_fields=['text1']))
+        text1_attribute_counts = {}
+        for attribute, values in text1_attribute_index:
+            text1_attribute_counts[attribute] = {}
+            for value, frames in values.iteritems():
+                text1_attribute_counts[attribute][value] = len(frames)
+
+        text2_attribute_index = dict(reader.get_attributes(include_fields=['text2']))
+
+        all_attribute_index = list(reader.get_attributes())
+        all_attribute_counts = {}
+        for attribute, values in all_attribute_index:
+            all_attribute_counts[attribute] = {}
+            for value, frames in values.iteritems():
+                all_attribute_counts[attribute][value] = len(frames)
+
+        doc_attribute_index = list(reader.get_attributes(return_documents=True))
+        doc_attribute_counts = {}
+        for attribute, values in doc_attribute_index:
+            doc_attribute_counts[attribute] = {}
+            for value, docs in values.iteritems():
+                doc_attribute_counts[attribute][value] = len(docs)
+
+    assert text1_attribute_counts['sentiment']['positive'] == 17
+    assert text1_attribute_counts['numerical_score'][1] == 10
+    assert text1_attribute_counts == all_attribute_counts
+    assert all(i == 1 for i in text1_attribute_counts['named_entity'].values())
+
+    assert all([
+        count == 1 for attribute, values in doc_attribute_counts.iteritems()
+        for value, count in values.iteritems()
+    ])
+
+    assert all(
+        [text2_attribute_index.get(i, None) is None for i in ['numerical_score', 'sentiment', 'named_entity']]
+    )
+
+    with IndexReader(index_dir) as reader:
+        attribute_frames = reader.get_frames(None, frame_ids=range(20))
+        for f_id, frame in attribute_frames:
+            assert frame['_attributes']['numerical_score'] == f_id // 10
             if f_id % 3 == 0:
-                attribute_index[f_id]['sentiment'] = 'positive'
+                assert frame['_attributes']['sentiment'] == 'positive'
+            else:
+                assert 'sentiment' not in frame['_attributes']
             if f_id % 11 == 0:
-                attribute_index[f_id]['named_entity'] = str(f_id)
-
-        with writer:
-            writer.append_frame_attributes(attribute_index)
+                assert frame['_attributes']['named_entity']
+            else:
+                assert 'named_entity' not in frame['_attributes']
 
-        with IndexReader(index_dir) as reader:
-            text1_attribute_index = list(reader.get_attributes(include_fields=['text1']))
-            text1_attribute_counts = {}
-            for attribute, values in text1_attribute_index:
-                text1_attribute_counts[attribute] = {}
-                for value, frames in values.iteritems():
-                    text1_attribute_counts[attribute][value] = len(frames)
-
-            text2_attribute_index = {key: values for key, values in reader.get_attributes(include_fields=['text2'])}
-
-            all_attribute_index = list(reader.get_attributes())
-            all_attribute_counts = {}
-            for attribute, values in all_attribute_index:
-                all_attribute_counts[attribute] = {}
-                for value, frames in values.iteritems():
-                    all_attribute_counts[attribute][value] = len(frames)
-
-            doc_attribute_index = list(reader.get_attributes(return_documents=True))
-            doc_attribute_counts = {}
-            for attribute, values in doc_attribute_index:
-                doc_attribute_counts[attribute] = {}
-                for value, docs in values.iteritems():
-                    doc_attribute_counts[attribute][value] = len(docs)
-
-        assert text1_attribute_counts['sentiment']['positive'] == 17
-        assert text1_attribute_counts['numerical_score'][1] == 10
-        assert text1_attribute_counts == all_attribute_counts
-        assert all(i == 1 for i in text1_attribute_counts['named_entity'].values())
-
-        assert all([
-            count == 1 for attribute, values in doc_attribute_counts.iteritems()
-            for value, count in values.iteritems()
-        ])
-
-        assert all(
-            [text2_attribute_index.get(i, None) is None for i in ['numerical_score', 'sentiment', 'named_entity']]
-        )
 
-        with IndexReader(index_dir) as reader:
-            attribute_frames = reader.get_frames(None, frame_ids=range(20))
-            for f_id, frame in attribute_frames:
-                assert frame['_attributes']['numerical_score'] == f_id // 10
-                if f_id % 3 == 0:
-                    assert frame['_attributes']['sentiment'] == 'positive'
-                else:
-                    assert 'sentiment' not in frame['_attributes']
-                if f_id % 11 == 0:
-                    assert frame['_attributes']['named_entity']
-                else:
-                    assert 'named_entity' not in frame['_attributes']
-
-
-def test_index_writer_rollback(index_dir):
-    with open(os.path.abspath('caterpillar/test_resources/alice_test_data.txt'), 'r') as f:
-        data = f.read()
-        analyser = TestAnalyser()
-        writer = IndexWriter(index_dir, IndexConfig(SqliteStorage, Schema(text=TEXT(analyser=analyser))))
-        writer.begin()
-        try:
-            writer.add_document(text=data)
-        finally:
-            writer.close()
+def test_index_writer_rollback(index_dir, alice_test_data):
+    analyser = TestAnalyser()
+    writer = IndexWriter(index_dir, IndexConfig(SqliteStorage, Schema(text=TEXT(analyser=analyser))))
+    writer.begin()
+    try:
+        writer.add_document(text=alice_test_data)
+    finally:
+        writer.close()
 
-        with IndexReader(index_dir) as reader:
-            assert reader.get_document_count() == 0
+    with IndexReader(index_dir) as reader:
+        assert reader.get_document_count() == 0
 
-        # Test rollback on exception
-        try:
-            with IndexWriter(index_dir, IndexConfig(SqliteStorage, Schema(text=TEXT(analyser=analyser)))) as writer:
-                writer.add_document(text=data)
-                raise ValueError()
-        except ValueError:
-            pass
+    # Test rollback on exception
+    try:
+        with IndexWriter(index_dir, IndexConfig(SqliteStorage, Schema(text=TEXT(analyser=analyser)))) as writer:
+            writer.add_document(text=alice_test_data)
+            raise ValueError()
+    except ValueError:
+        pass
 
-        with IndexReader(index_dir) as reader:
-            assert reader.get_document_count() == 0
+    with IndexReader(index_dir) as reader:
+        assert reader.get_document_count() == 0
 
 
 def test_index_writer_lock(index_dir):
@@ -325,26 +367,24 @@ def test_index_writer_lock(index_dir):
             writer2.begin(timeout=0.5)
 
 
-def test_index_frames_docs_alice(index_dir):
-    with open(os.path.abspath('caterpillar/test_resources/alice_test_data.txt'), 'r') as f:
-        data = f.read()
-        analyser = TestAnalyser()
-        writer = IndexWriter(index_dir, IndexConfig(SqliteStorage,
-                                                    Schema(text=TEXT(analyser=analyser),
-                                                           document=TEXT(analyser=analyser, indexed=False))))
-        with writer:
-            writer.add_document(text=data, document='alice.txt', frame_size=2)
+def test_index_frames_docs_alice(index_dir, alice_test_data):
+    analyser = TestAnalyser()
+    writer = IndexWriter(index_dir, IndexConfig(SqliteStorage,
+                                                Schema(text=TEXT(analyser=analyser),
+                                                       document=TEXT(analyser=analyser, indexed=False))))
+    with writer:
+        writer.add_document(text=alice_test_data, document='alice.txt', frame_size=2)
 
-        with IndexReader(index_dir) as reader:
-            assert reader.get_frame_count('text') == 52
+    with IndexReader(index_dir) as reader:
+        assert reader.get_frame_count('text') == 52
 
-            frame_id = reader.get_term_positions('Alice', 'text').keys()[0]
-            frame = reader.get_frame(frame_id, 'text')
-            assert frame_id == frame['_id']
+        frame_id = reader.get_term_positions('Alice', 'text').keys()[0]
+        frame = reader.get_frame(frame_id, 'text')
+        assert frame_id == frame['_id']
 
-            doc_id = frame['_doc_id']
-            assert doc_id == reader.get_document(doc_id)['_id']
-            assert doc_id == next(reader.get_documents())[0]
+        doc_id = frame['_doc_id']
+        assert doc_id == reader.get_document(doc_id)['_id']
+        assert doc_id == next(reader.get_documents())[0]
 
 
 def test_index_moby_small(index_dir):
@@ -356,31 +396,29 @@ def test_index_moby_small(index_dir):
             writer.add_document(text=data, frame_size=2, )
 
         with IndexReader(index_dir) as reader:
-            assert sum(1 for _ in reader.get_term_positions('Mr. Chace', 'text')) == 1
-            assert sum(1 for _ in reader.get_term_positions('CONVERSATIONS', 'text')) == 1
-            assert sum(1 for _ in reader.get_frequencies('text')) == 38
+            assert len(reader.get_term_positions('Mr. Chace', 'text')) == 1
+            assert len(reader.get_term_positions('CONVERSATIONS', 'text')) == 1
+            assert reader.get_vocab_size('text') == 38
 
 
-def test_index_alice_bigram_discovery(index_dir):
-    with open(os.path.abspath('caterpillar/test_resources/alice.txt'), 'r') as f:
-        data = f.read()
-        with IndexWriter(index_dir, IndexConfig(SqliteStorage, Schema(text=TEXT))) as writer:
-            writer.add_document(text=data, frame_size=2)
+def test_index_alice_bigram_discovery(index_dir, alice_data):
+    with IndexWriter(index_dir, IndexConfig(SqliteStorage, Schema(text=TEXT))) as writer:
+        writer.add_document(text=alice_data, frame_size=2)
 
-        with IndexReader(index_dir) as reader:
-            bi_grams = find_bi_gram_words(reader.get_frames('text'))
-            assert len(bi_grams) == 4
-            assert 'golden key' in bi_grams
-            index_bigrams = reader.detect_significant_ngrams(min_count=5, threshold=40)
-            assert ('golden', 'key') in index_bigrams
+    with IndexReader(index_dir) as reader:
+        bi_grams = find_bi_gram_words(reader.get_frames('text'))
+        assert len(bi_grams) == 4
+        assert 'golden key' in bi_grams
+        index_bigrams = reader.detect_significant_ngrams(min_count=5, threshold=40)
+        assert ('golden', 'key') in index_bigrams
 
-            # Increasing the threshold should result in fewer bigrams
-            old_n = 1e6  # Nonsense high value for first comparison.
-            for threshold in range(0, 100, 10):
-                index_bigrams = reader.detect_significant_ngrams(min_count=5, threshold=threshold)
-                n_bigrams = len(index_bigrams)
-                assert n_bigrams <= old_n
-                old_n = n_bigrams
+        # Increasing the threshold should result in fewer bigrams
+        old_n = 1e6  # Nonsense high value for first comparison.
+        for threshold in range(0, 100, 10):
+            index_bigrams = reader.detect_significant_ngrams(min_count=5, threshold=threshold)
+            n_bigrams = len(index_bigrams)
+            assert n_bigrams <= old_n
+            old_n = n_bigrams
 
 
 def test_moby_bigram_discovery(index_dir):
@@ -438,12 +476,10 @@ def test_detect_case_variations(index_dir):
     return None
 
 
-def test_term_frequency_vectors(index_dir):
+def test_term_frequency_vectors(index_dir, alice_data):
     """Test iterating through the term_frequency vectors. """
-    with open(os.path.abspath('caterpillar/test_resources/alice.txt'), 'r') as f:
-        data = f.read()
-        with IndexWriter(index_dir, IndexConfig(SqliteStorage, Schema(text=TEXT))) as writer:
-            writer.add_document(text=data, frame_size=2)
+    with IndexWriter(index_dir, IndexConfig(SqliteStorage, Schema(text=TEXT))) as writer:
+        writer.add_document(text=alice_data, frame_size=2)
 
     with IndexReader(index_dir) as reader:
         # the term-frequency vectors should accumulate to the same state as the vocabulary statistics
@@ -484,58 +520,50 @@ def test_term_frequency_vectors(index_dir):
         assert frame_count == len(total_frames)
 
 
-def test_index_alice_merge_bigram(index_dir):
+def test_index_alice_merge_bigram(index_dir, alice_data):
     """Test constructing indexes with the bigram analyser. """
-    with open(os.path.abspath('caterpillar/test_resources/alice.txt'), 'r') as f:
-        f.seek(0)
-        data = f.read()
+    with IndexWriter(index_dir, IndexConfig(SqliteStorage, Schema(text=TEXT))) as writer:
+        writer.add_document(text=alice_data)
 
-        with IndexWriter(index_dir, IndexConfig(SqliteStorage, Schema(text=TEXT))) as writer:
-            writer.add_document(text=data)
-
-        with IndexReader(index_dir) as reader:
-            min_bigram_count = 3
-            bi_grams = find_bi_gram_words(reader.get_frames('text'), min_count=min_bigram_count)
-            # Remove the detected bigram 'kid gloves', that only ever occurs after 'white kid'
-            # In the bigram analyzer, detected bigrams are consumed in lexical order.
-            bi_grams = [b for b in bi_grams if b != 'kid gloves']
+    with IndexReader(index_dir) as reader:
+        min_bigram_count = 3
+        bi_grams = find_bi_gram_words(reader.get_frames('text'), min_count=min_bigram_count)
+        # Remove the detected bigram 'kid gloves', that only ever occurs after 'white kid'
+        # In the bigram analyzer, detected bigrams are consumed in lexical order.
+        bi_grams = [b for b in bi_grams if b != 'kid gloves']
 
-        bigram_index = os.path.join(tempfile.mkdtemp(), "bigram")
-        try:
-            analyser = TestBiGramAnalyser(bi_grams)
-            with IndexWriter(bigram_index, IndexConfig(SqliteStorage, Schema(text=TEXT(analyser=analyser)))) as writer:
-                writer.add_document(text=data)
+    bigram_index = os.path.join(tempfile.mkdtemp(), "bigram")
+    try:
+        analyser = TestBiGramAnalyser(bi_grams)
+        with IndexWriter(bigram_index, IndexConfig(SqliteStorage, Schema(text=TEXT(analyser=analyser)))) as writer:
+            writer.add_document(text=alice_data)
 
-            # Verify found bigrams exist in both
-            with IndexReader(index_dir) as original_reader, IndexReader(bigram_index) as bigrams:
+        # Verify found bigrams exist in both
+        with IndexReader(index_dir) as original_reader, IndexReader(bigram_index) as bigrams:
 
-                for bigram in bi_grams:
-                    assert bigrams.get_term_frequency(bigram, 'text')
+            for bigram in bi_grams:
+                assert bigrams.get_term_frequency(bigram, 'text')
 
-                for term, frequency in original_reader.get_frequencies('text'):
-                    try:
-                        assert bigrams.get_term_frequency(term, 'text') <= frequency
-                    except KeyError:  # The bigram analyzer and default analyzer behave differently
-                        continue
+            for term, frequency in original_reader.get_frequencies('text'):
+                try:
+                    assert bigrams.get_term_frequency(term, 'text') <= frequency
+                except KeyError:  # The bigram analyzer and default analyzer behave differently
+                    continue
 
-        finally:
-            shutil.rmtree(bigram_index)
+    finally:
+        shutil.rmtree(bigram_index)
 
 
-def test_alice_case_folding(index_dir):
+def test_alice_case_folding(index_dir, alice_data):
     """Test constructing indexes with the bigram analyser. """
-    with open(os.path.abspath('caterpillar/test_resources/alice.txt'), 'r') as f:
-        f.seek(0)
-        data = f.read()
-
-        with IndexWriter(index_dir, IndexConfig(SqliteStorage, Schema(text=TEXT))) as writer:
-            writer.add_document(text=data)
+    with IndexWriter(index_dir, IndexConfig(SqliteStorage, Schema(text=TEXT))) as writer:
+        writer.add_document(text=alice_data)
 
-        with IndexReader(index_dir) as reader:
-            normalise_case = reader.get_case_fold_terms(['text'])
-            for term, normalise_term in normalise_case:
-                assert term.title() == normalise_term or term.lower() == normalise_term
-                assert reader.get_term_frequency(term, 'text') < reader.get_term_frequency(normalise_term, 'text')
+    with IndexReader(index_dir) as reader:
+        normalise_case = reader.get_case_fold_terms(['text'])
+        for term, normalise_term in normalise_case:
+            assert term.title() == normalise_term or term.lower() == normalise_term
+            assert reader.get_term_frequency(term, 'text') < reader.get_term_frequency(normalise_term, 'text')
 
 
 def test_index_utf8(index_dir):
@@ -585,6 +613,26 @@ def test_index_encoding(index_dir):
     assert len(writer.last_committed_documents) == 1
 
 
+def test_index_frames_staged_as_str(index_dir, monkeypatch):
+    staged = []
+    add_analyzed_document = SqliteWriter.add_analyzed_document
+
+    def capture(self, document_format, document_data):
+        staged.append(document_data)
+        return add_analyzed_document(self, document_format, document_data)
+
+    monkeypatch.setattr(SqliteWriter, 'add_analyzed_document', capture)
+    writer = IndexWriter(index_dir, IndexConfig(SqliteStorage, Schema(text=TEXT(analyser=TestAnalyser()),
+                                                                      category=ID(indexed=True))))
+    with writer:
+        writer.add_document(text=u'Sentence one. Sentence two.', category='a', frame_size=1)
+        writer.add_document(category='b')  # Surrogate, metadata only frame
+
+    frames = [frame for _, _, doc_frames, _ in staged for frame_list in doc_frames.values() for frame in frame_list]
+    assert len(frames) == 3
+    assert all(type(frame) is str for frame in frames)
+
+
 def test_index_state(index_dir):
     with open(os.path.abspath('caterpillar/test_resources/detractors.csv'), 'rbU') as f:
         csv_reader = csv.reader(f)
@@ -612,77 +660,67 @@ def test_index_state(index_dir):
             assert revision != reader.get_revision()
 
 
-def test_index_reader_writer_isolation(index_dir):
+def test_index_reader_writer_isolation(alice_index_dir, alice_test_data):
     """Test that readers and writers are isolated."""
-    with open(os.path.abspath('caterpillar/test_resources/alice_test_data.txt'), 'r') as f:
-        data = f.read()
-        writer = IndexWriter(index_dir, IndexConfig(SqliteStorage, Schema(text=TEXT)))
-        with writer:
-            writer.add_document(text=data)
 
-        reader = IndexReader(index_dir)
-        reader.begin()
+    reader = IndexReader(alice_index_dir)
+    reader.begin()
 
-        assert reader.get_frame_count('text') == 52
-        assert reader.get_term_frequency('Alice', 'text') == 23
+    assert reader.get_frame_count('text') == 52
+    assert reader.get_term_frequency('Alice', 'text') == 23
 
-        # Add another copy of Alice
-        writer = IndexWriter(index_dir, Schema(text=TEXT))
-        with writer:
-            writer.add_document(text=data)
+    # Add another copy of Alice
+    writer = IndexWriter(alice_index_dir, Schema(text=TEXT))
+    with writer:
+        writer.add_document(text=alice_test_data)
 
-        # Check reader can't see it
-        assert reader.get_frame_count('text') == 52
-        assert reader.get_term_frequency('Alice', 'text') == 23
+    # Check reader can't see it
+    assert reader.get_frame_count('text') == 52
+    assert reader.get_term_frequency('Alice', 'text') == 23
 
-        # Open new reader and make sure it CAN see the changes
-        with IndexReader(index_dir) as reader1:
-            assert reader1.get_frame_count('text') == reader.get_frame_count('text') * 2
-            assert reader1.get_term_frequency('Alice', 'text') == reader.get_term_frequency('Alice', 'text') * 2
+    # Open new reader and make sure it CAN see the changes
+    with IndexReader(alice_index_dir) as reader1:
+        assert reader1.get_frame_count('text') == reader.get_frame_count('text') * 2
+        assert reader1.get_term_frequency('Alice', 'text') == reader.get_term_frequency('Alice', 'text') * 2
 
-        reader.close()
+    reader.close()
 
 
-def test_index_document_delete(index_dir):
+def test_index_document_delete(alice_index_dir, alice_test_data):
     """Sanity test for delete document."""
-    with open(os.path.abspath('caterpillar/test_resources/alice_test_data.txt'), 'r') as f:
-        data = f.read()
-        with IndexWriter(index_dir, IndexConfig(SqliteStorage, Schema(text=TEXT))) as writer:
-            writer.add_document(text=data)
-            doc_id = writer.add_document(text=data)
+    with IndexWriter(alice_index_dir) as writer:
+        doc_id = writer.add_document(text=alice_test_data)
 
-        with IndexReader(index_dir) as reader:
-            assert reader.get_frame_count('text') == 104
-            assert reader.get_term_frequency('Alice', 'text') == 46
+    with IndexReader(alice_index_dir) as reader:
+        assert reader.get_frame_count('text') == 104
+        assert reader.get_term_frequency('Alice', 'text') == 46
 
-        with IndexWriter(index_dir) as writer:
-            writer.delete_document(doc_id)
+    with IndexWriter(alice_index_dir) as writer:
+        writer.delete_document(doc_id)
 
-        with IndexReader(index_dir) as reader:
-            assert reader.get_frame_count('text') == 52
-            assert reader.get_term_frequency('Alice', 'text') == 23
+    with IndexReader(alice_index_dir) as reader:
+        assert reader.get_frame_count('text') == 52
+        assert reader.get_term_frequency('Alice', 'text') == 23
 
 
-def test_index_multi_document_delete(index_dir):
+def test_index_multi_document_delete(alice_index_dir, alice_test_data):
     """Sanity test for deleting multiple documents."""
-    with open(os.path.abspath('caterpillar/test_resources/alice_test_data.txt'), 'r') as f:
-        data = f.read()
-        doc_ids = []
-        with IndexWriter(index_dir, IndexConfig(SqliteStorage, Schema(text=TEXT))) as writer:
-            doc_ids.append(writer.add_document(text=data))
-            doc_ids.append(writer.add_document(text=data))
+    with IndexReader(alice_index_dir) as reader:
+        doc_ids = [doc_id for doc_id, _ in reader.get_documents()]
+    with IndexWriter(alice_index_dir) as writer:
+        doc_ids.append(writer.add_document(text=alice_test_data))
 
-        with IndexReader(index_dir) as reader:
-            assert reader.get_frame_count('text') == 104
-            assert reader.get_document_count() == 2
+    with IndexReader(alice_index_dir) as reader:
+        assert reader.get_frame_count('text') == 104
+        assert reader.get_document_count() == 2
 
-        with IndexWriter(index_dir) as writer:
-            for doc_id in doc_ids:
-                writer.delete_document(doc_id)
+    with IndexWriter(alice_index_dir) as writer:
+        for doc_id in doc_ids:
+            writer.delete_document(doc_id)
 
-        with IndexReader(index_dir) as reader:
-            assert reader.get_frame_count('text') == 0
-            assert reader.get_document_count() == 0
+    with IndexReader(alice_index_dir) as reader:
+        assert reader.get_frame_count('text') == 0
+        assert reader.get_document_count() == 0
 
 
 def test_metadata_only_retrieval_deletion(index_dir):
@@ -373,7 +373,7 @@ def test_reader_query_advanced(index_dir):
         assert len(composition.exclude(product_results, both_genders)) == 0
 
         # Comparing searching against the full metadata:
-        all_metadata = {field: values for field, values in reader.get_metadata(None)}
+        all_metadata = dict(reader.get_metadata(None))
         assert len(all_metadata['gender']['male']) == len(male_gender)
 
         with pytest.raises(NonIndexedFieldError):
@@ -1,15 +1,18 @@
 # Copyright (c) 2012-2014 Kapiche Limited
 # Author: Kris Rogers <kris@kapiche.com>, Ryan Stuart <ryan@kapiche.com>
 """Tests for caterpillar.processing.schema"""
+import cPickle
 import csv
 import os
 import shutil
 import tempfile
+from cStringIO import StringIO
 from caterpillar.storage.sqlite import SqliteStorage
 
 import pytest
 
-from caterpillar.processing.analysis.analyse import DateTimeAnalyser
+from caterpillar.processing.analysis.analyse import Analyser, DateTimeAnalyser
+from caterpillar.processing.analysis.tokenize import Token
 from caterpillar.processing import schema
 from caterpillar.processing.index import IndexWriter, IndexReader, IndexConfig
 from caterpillar.processing.schema import (
@@ -31,6 +34,8 @@ def test_schema():
     assert 'test' in names
     assert 'user' in names
     assert len(items) == 2
+    assert names == ['test', 'user']
+    assert [name for name, _ in items] == names
 
     assert isinstance(simple_schema['test'], TEXT)
     assert isinstance(simple_schema['user'], ID)
@@ -40,6 +45,20 @@ def test_schema():
     for field in simple_schema:
         assert isinstance(field, FieldType)
 
+    indexed_schema = Schema(text=TEXT, num=NUMERIC(indexed=True), cat=CATEGORICAL_TEXT(indexed=True),
+                            user=ID(stored=False))
+    assert indexed_schema.get_stored_fields() == ['cat', 'num', 'text']
+    assert indexed_schema.get_indexed_text_fields() == ['text']
+    assert indexed_schema.get_indexed_structured_fields() == ['cat', 'num']
+    assert indexed_schema.get_indexed_categorical_fields() == ['cat', 'num']
+    assert indexed_schema.get_indexed_unstructured_fields() == ['text']
+    indexed_schema.label = 'survey'  # Attributes other than the fields survive pickling
+    unpickled_schema = cPickle.loads(cPickle.dumps(indexed_schema))
+    assert unpickled_schema.names() == indexed_schema.names()
+    assert unpickled_schema.get_indexed_structured_fields() == ['cat', 'num']
+    assert unpickled_schema.get_indexed_unstructured_fields() == ['text']
+    assert unpickled_schema.label == 'survey'
+
     assert 'test' in simple_schema
     assert 'text' not in simple_schema
 
@@ -61,8 +80,15 @@ def test_schema():
     with pytest.raises(ValueError):
         list(NUMERIC().analyse('notanumber'))
 
+    assert NUMERIC().value_of('3') == 3
+    assert NUMERIC(default_value=7).value_of('') == 7
+    assert ID().value_of('some id') == 'some id'
+
     f = NUMERIC(num_type=float)
     assert f.equals('1', '1.0')
+    assert f.evaluate_op('=', '1', '1.0')
+    assert f.evaluate_op('<', '1', '2')
+    assert cPickle.loads(cPickle.dumps(f)).evaluate_op('>=', '2', '1.5')
 
     dt = DATETIME(analyser=DateTimeAnalyser(datetime_formats=['HH:mm DD/MM/YYYY']))
     assert dt.value_of('10:05 01/12/2016') == '2016-12-01T10:05:00z'
@@ -75,10 +101,35 @@ def test_schema():
     assert dt.lte('10:05 01/12/2015', '10:05 01/12/2016')
 
     assert list(BOOLEAN().analyse('1'))[0].value is True
+    assert BOOLEAN().value_of('') is False
+    assert BOOLEAN().equals(1, True)
 
     c = CATEGORICAL_TEXT()
     assert c.equals('cat', 'cat')
     assert c.equals_wildcard('cat', 'ca*')
+    assert not c.equals_wildcard('dog', 'ca*')
+    assert c.equals_wildcard('category', 'cat')
+    assert not c.equals_wildcard('cab', 'cat')
+    assert c.equals_wildcard('caf\xc3\xa9', u'caf')
+    assert not c.equals_wildcard('ca\xc3\xa9', u'caf')
+    assert c.equals_wildcard('cat.', 'cat\\.')
+    assert not c.equals_wildcard('cats', 'cat\\.')
+    assert c.equals_wildcard('(aa)', r'\(a+\)+')
+    assert c.equals_wildcard('+', r'(\+)+')
+    assert c.equals_wildcard('aa', '(a+)+$')
+    assert c.equals_wildcard('+', '([+])+')
+
+
+class UpperCaseListAnalyser(Analyser):
+    """Analyser returning a list of tokens rather than a generator."""
+    def analyse(self, value):
+        return [Token(value.upper())]
+
+
+def test_value_of_list_analyser():
+    field = schema.CategoricalFieldType(analyser=UpperCaseListAnalyser())
+    assert field.value_of('cat') == 'CAT'
+    assert field.equals('cat', 'CAT')
 
 
 def test_csv_schema():
@@ -93,6 +144,45 @@ def test_csv_schema():
     index_schema = csv_schema.as_index_schema()
 
     assert len(index_schema) == len(columns)
+    assert isinstance(index_schema['text'], TEXT)
+    assert index_schema['float'].value_of('1.5') == 1.5
+    assert index_schema['integer'].value_of('2') == 2
+    assert isinstance(index_schema['string'], CATEGORICAL_TEXT)
+
+    columns[1].type = schema.ColumnDataType.IGNORE
+    assert csv_schema.map_row(['a', '1.5', '2', 'b']) == {'text': 'a', 'integer': '2', 'string': 'b'}
+
+
+def test_column_spec_pickle():
+    column = schema.ColumnSpec('free text', schema.ColumnDataType.TEXT)
+    for protocol in range(cPickle.HIGHEST_PROTOCOL + 1):
+        unpickled_column = cPickle.loads(cPickle.dumps(column, protocol))
+        assert unpickled_column.name == 'free text'
+        assert unpickled_column.field_name == 'freetext'
+        assert unpickled_column.type == schema.ColumnDataType.TEXT
+
+
+def test_csv_schema_pickle():
+    columns = [schema.ColumnSpec('text', schema.ColumnDataType.TEXT)]
+    csv_schema = schema.CsvSchema(columns, True, csv.excel, sample_rows=[['a']])
+    for protocol in range(cPickle.HIGHEST_PROTOCOL + 1):
+        unpickled_schema = cPickle.loads(cPickle.dumps(csv_schema, protocol))
+        assert [column.name for column in unpickled_schema.columns] == ['text']
+        assert unpickled_schema.has_header is True
+        assert unpickled_schema.dialect is csv.excel
+        assert unpickled_schema.sample_rows == [['a']]
+
+
+def test_count_words():
+    for value in ['', 'one', ' two words ', 'snake_case, 3 more-words!', 'caf\xc3\xa9 ol\xc3\xa9', u'caf\xe9 au lait']:
+        assert schema._count_words(value) == len(schema._WORD_RE.findall(value))
+
+
+def test_count_column_words():
+    column = ['one two', 'three', 'four five six']
+    assert schema._count_column_words(column, 100) == 6
+    assert schema._count_column_words(column, 2) == 2
+    assert schema._count_column_words(column, 3) == 3
 
 
 # Functional tests
@@ -102,6 +192,15 @@ def test_csv_has_header_sentiment():
         assert schema.csv_has_header(f.read(), csv.excel) is True
 
 
+def test_csv_has_header_from_rows():
+    """Test the header heuristic on rows that have already been parsed."""
+    assert schema.csv_has_header_from_rows([['a', 'b'], ['some long text', 'more long text']]) is True
+    assert schema.csv_has_header_from_rows([['some long text', 'more long text'], ['a', 'b']]) is False
+    assert schema.csv_has_header_from_rows([['a', 'b']]) is False
+    # Rows may mix unicode cells with non-ascii byte string cells
+    assert schema.csv_has_header_from_rows([[u'a', 'b'], [u'some long text', 'caf\xc3\xa9 au lait']]) is True
+
+
 def test_csv_has_header_no_header():
     """Test function for recognising headers with a CSV file with no header row."""
     with open(os.path.abspath('caterpillar/test_resources/test_no_header.csv'), 'rbU') as f:
@@ -116,6 +215,21 @@ def test_generate_schema_no_header():
         assert len(csv_schema.columns) == 7
 
 
+def test_generate_schema_from_file_start():
+    """The schema is generated from the start of the file, wherever it is positioned."""
+    with open(os.path.abspath('caterpillar/test_resources/test_small.csv'), 'rbU') as f:
+        f.readline()
+        csv_schema = schema.generate_csv_schema(f)
+        assert csv_schema.has_header is True
+        assert csv_schema.columns[0].name == 'Respondant'
+
+
+def test_generate_schema_empty():
+    """An empty file has no schema to generate."""
+    with pytest.raises(StopIteration):
+        schema.generate_csv_schema(StringIO(''))
+
+
 def test_generate_schema_small():
     """Test generation of schema for small CSV file."""
     with open(os.path.abspath('caterpillar/test_resources/test_small.csv'), 'rbU') as f:
@@ -154,7 +154,7 @@ def test_add_get_document(tmp_dir):
     assert len(meta) == 2
 
     # Term associations
-    associations = {term: values for term, values in reader.iterate_associations()}
+    associations = dict(reader.iterate_associations())
     assert len(associations) == 6
     assert all([freq == 101 for values in associations.values() for freq in values.values()])
 